@@ -1,23 +1,141 @@
 """ETL pipeline for analysing products data across the globe for the last 60 years"""
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from zipfile import ZipFile
-import json
-import glob
+import io
 import os
 import configparser
-import pandas as pd
+from pathlib import Path
+import orjson
 import requests
+import requests_cache
 import dask.dataframe as dd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
 
 # ----------------------------------------------------------------
 # Config file
 config = configparser.ConfigParser()
 config.read('dl.cfg')
+AWS_KEYS = config["AWS"]
+BUCKET = config["AWS"]["OUTPUT_DATA"]
+INPUT_DATA = config["LOCAL"]["INPUT_DATA"]
+
+# number of concurrent calls to the restcountries API
+API_MAX_WORKERS = 32
+
+# on-disk cache of restcountries API responses, reused between ETL runs
+API_CACHE_NAME = 'data/rc_cache'
+API_CACHE_EXPIRE_AFTER = timedelta(days=7)
+
+# result files (or folders with partition files) produced by the pipeline
+RESULT_FILES = ['dim_unit.parquet', 'dim_item_group.parquet', 'dim_flag.parquet',
+                'dim_element.parquet', 'dim_country_group.parquet',
+                'fact_world_data', 'dim_country_info.parquet']
+
+# number of dimension tables processed (and uploaded to S3) at the same time
+DIMENSION_WORKERS = 5
+
+# number of partition files of the fact table uploaded to S3 at the same time
+PARTITION_UPLOAD_WORKERS = 8
+
+# number of concurrent S3 requests made by the quality checks
+QUALITY_CHECK_WORKERS = 8
+
+# read buffer used when extracting the input data archive
+ZIP_READ_BUFFER_SIZE = 1024 * 1024
+
+# multipart, multi-threaded settings shared by all S3 uploads
+TRANSFER_CONFIG = TransferConfig(multipart_threshold=8 * 1024 * 1024,
+                                 multipart_chunksize=16 * 1024 * 1024,
+                                 max_concurrency=10, use_threads=True)
+
+# S3 connection pool large enough for all concurrent uploads and their threads
+S3_MAX_POOL_CONNECTIONS = max(DIMENSION_WORKERS, PARTITION_UPLOAD_WORKERS) \
+    * TRANSFER_CONFIG.max_concurrency
+
+
+# ----------------------------------------------------------------
+# Save result file locally and upload it to S3 bucket
+def save_and_upload(s3, table, final_directory, file_name):
+    """Serialize the result table to Parquet once in memory,
+        write this copy to the local output folder and
+        upload the same bytes to S3 bucket without reading the file back.
+
+    Args:
+        - s3: boto3 client for using AWS S3 bucket
+        - table: pyarrow table with the result data
+        - final_directory: path to the output of the current ETL pipeline
+        - file_name: name of the result file, also used as the S3 key
+    """
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression='zstd')
+
+    # saving result file
+    with open(Path(final_directory) / file_name, 'wb') as outfile:
+        outfile.write(buffer.getbuffer())
+
+    # upload file to S3
+    buffer.seek(0)
+    s3.upload_fileobj(buffer, BUCKET, file_name, Config=TRANSFER_CONFIG)
+
+
+# ----------------------------------------------------------------
+# List and delete objects in S3 bucket
+def list_object_keys(s3, prefix):
+    """Get the keys of all objects in S3 bucket under the given prefix.
+
+    Args:
+        - s3: boto3 client for using AWS S3 bucket
+        - prefix: prefix of the object keys, e.g. 'fact_world_data/'
+    """
+    keys = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=BUCKET, Prefix=prefix):
+        keys.extend(item['Key'] for item in page.get('Contents', []))
+    return keys
+
+
+def delete_objects(s3, keys):
+    """Delete the given objects from S3 bucket, in batches of 1000 keys per request.
+
+    Args:
+        - s3: boto3 client for using AWS S3 bucket
+        - keys: keys of the objects to delete
+    """
+    for start in range(0, len(keys), 1000):
+        s3.delete_objects(
+            Bucket=BUCKET,
+            Delete={'Objects': [{'Key': key} for key in keys[start:start + 1000]],
+                    'Quiet': True})
 
 
 # ----------------------------------------------------------------
 # Prepare source data - unzip data folder to have access to most data sources
+def extract_zip_member(zip_path, member_name, destination):
+    """Extract one member of the zip archive through its own buffered file handle,
+        so that parallel extractions do not share (and invalidate) one read buffer.
+
+    Args:
+        - zip_path: path to the zip archive
+        - member_name: name of the member inside the archive
+        - destination: folder where the member is extracted
+    """
+    with open(zip_path, 'rb', buffering=ZIP_READ_BUFFER_SIZE) as zip_file, \
+            ZipFile(zip_file, 'r') as zip_object:
+        try:
+            zip_object.extract(member_name, path=destination)
+        except FileExistsError:
+            # another worker created a shared parent folder at the same time,
+            # the folder exists now so the extraction can be repeated
+            zip_object.extract(member_name, path=destination)
+
+
 def prepare_data_sources(current_directory):
     """Unzip folder with source data from 'data' folder of the repository for future use.
 
@@ -27,11 +145,17 @@ def prepare_data_sources(current_directory):
     """
     print("********* STEP 1 START ************")
     print("Preparing input data sources - unzipping an archive in the 'data' folder.")
+    zip_path = Path(current_directory) / INPUT_DATA
+    destination = Path(current_directory) / 'data'
     # loading the data.zip and creating a zip object
-    with ZipFile(f'{current_directory}\\{config["LOCAL"]["INPUT_DATA"]}', 'r') as zip_object:
-        # Extracting all the members of the zip into a specific location.
-        zip_object.extractall(
-            path=f"{current_directory}\\data")
+    with ZipFile(zip_path, 'r') as zip_object:
+        member_names = zip_object.namelist()
+    # Extracting the members of the zip in parallel into a specific location,
+    # zlib releases the GIL so members are decompressed concurrently.
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        list(executor.map(
+            lambda member_name: extract_zip_member(zip_path, member_name, destination),
+            member_names))
     print(f"Current directory is {current_directory}")
     print("Step1 - Preparation of input data sources is finished successfully.")
     print("********* STEP 1 FINISHED ************")
@@ -42,7 +166,7 @@ def prepare_data_sources(current_directory):
 def process_units_data(s3, final_directory):
     """Load input 'Units.csv' data,
         make transformations and
-        store the result CSV file first locally and then upload to S3 bucket.
+        store the result Parquet file locally and upload it to S3 bucket.
 
     Args:
         - s3: boto3 client for using AWS S3 bucket
@@ -50,17 +174,17 @@ def process_units_data(s3, final_directory):
     """
     print("********* STEP 2 (units) START ************")
 
-    data_units = pd.read_csv('data/Units.csv')
-    data_units_final = data_units.rename(
-        columns={'Unit Name': 'unit_name', 'Description': 'description'})
-
-    # saving result file
-    data_units_final.to_csv(
-        f'{final_directory}/dim_unit.csv', index=False)
-
-    # upload file to S3
-    s3.upload_file(f'{final_directory}/dim_unit.csv',
-                   f'{config["AWS"]["OUTPUT_DATA"]}', 'dim_unit.csv')
+    data_units = pv.read_csv(
+        'data/Units.csv',
+        parse_options=pv.ParseOptions(newlines_in_values=True),
+        convert_options=pv.ConvertOptions(
+            include_columns=['Unit Name', 'Description'],
+            column_types={'Unit Name': pa.string(), 'Description': pa.string()},
+            strings_can_be_null=True))
+    data_units = data_units.rename_columns(['unit_name', 'description'])
+
+    # saving result file locally and in S3 bucket
+    save_and_upload(s3, data_units, final_directory, 'dim_unit.parquet')
     print("********* STEP 2 (units) FINISHED ************")
 
 
@@ -69,7 +193,7 @@ def process_units_data(s3, final_directory):
 def process_item_group_data(s3, final_directory):
     """Load input 'ItemGroup.csv' data,
         make transformations and
-        store the result CSV file first locally and then upload to S3 bucket.
+        store the result Parquet file locally and upload it to S3 bucket.
 
     Args:
         - s3: boto3 client for using AWS S3 bucket
@@ -77,20 +201,20 @@ def process_item_group_data(s3, final_directory):
     """
 
     print("********* STEP 3 (item group) START ************")
-    data_item_group = pd.read_csv('data/ItemGroup.csv')
-
-    data_item_group_final = data_item_group.rename(
-        columns={'Item Group Code': 'item_group_code', 'Item Group': 'item_group',
-                 'Item Code': 'item_code', 'Item': 'item'})\
-        .drop(columns=['Factor', 'CPC Code', 'HS Code', 'HS07 Code', 'HS12 Code'])
-
-    # saving result file
-    data_item_group_final.to_csv(
-        f'{final_directory}/dim_item_group.csv', index=False)
-
-    # upload file to S3
-    s3.upload_file(f'{final_directory}/dim_item_group.csv',
-                   config["AWS"]["OUTPUT_DATA"], 'dim_item_group.csv')
+    data_item_group = pv.read_csv(
+        'data/ItemGroup.csv',
+        parse_options=pv.ParseOptions(newlines_in_values=True),
+        convert_options=pv.ConvertOptions(
+            include_columns=['Item Group Code', 'Item Group', 'Item Code', 'Item'],
+            column_types={'Item Group Code': pa.string(), 'Item Group': pa.string(),
+                          'Item Code': pa.int64(), 'Item': pa.string()},
+            strings_can_be_null=True))
+    data_item_group = data_item_group.rename_columns(
+        ['item_group_code', 'item_group', 'item_code', 'item'])
+
+    # saving result file locally and in S3 bucket
+    save_and_upload(s3, data_item_group,
+                    final_directory, 'dim_item_group.parquet')
     print("********* STEP 3 (item group) FINISHED ************")
 
 
@@ -99,7 +223,7 @@ def process_item_group_data(s3, final_directory):
 def process_flags_data(s3, final_directory):
     """Load input 'Flags.csv' data,
         make transformations and
-        store the result CSV file first locally and then upload to S3 bucket.
+        store the result Parquet file locally and upload it to S3 bucket.
 
     Args:
         - s3: boto3 client for using AWS S3 bucket
@@ -107,19 +231,19 @@ def process_flags_data(s3, final_directory):
     """
 
     print("********* STEP 4 (flags) START ************")
-    data_flags = pd.read_csv('data/Flags.csv')
+    data_flags = pv.read_csv(
+        'data/Flags.csv',
+        parse_options=pv.ParseOptions(newlines_in_values=True),
+        convert_options=pv.ConvertOptions(
+            include_columns=['Flag', 'Description'],
+            column_types={'Flag': pa.string(), 'Description': pa.string()},
+            strings_can_be_null=True))
 
     # data transformations
-    data_flag_final = data_flags.rename(
-        columns={'Flag': 'flag', 'Description': 'description'})
-
-    # saving result file
-    data_flag_final.to_csv(
-        f'{final_directory}/dim_flag.csv', index=False)
+    data_flags = data_flags.rename_columns(['flag', 'description'])
 
-    # upload file to S3
-    s3.upload_file(f'{final_directory}/dim_flag.csv',
-                   config["AWS"]["OUTPUT_DATA"], 'dim_flag.csv')
+    # saving result file locally and in S3 bucket
+    save_and_upload(s3, data_flags, final_directory, 'dim_flag.parquet')
     print("********* STEP 4 (flags) FINISHED ************")
 
 
@@ -128,7 +252,7 @@ def process_flags_data(s3, final_directory):
 def process_elements_data(s3, final_directory):
     """Load input 'Elements.csv' data,
         make transformations and
-        store the result CSV file first locally and then upload to S3 bucket.
+        store the result Parquet file locally and upload it to S3 bucket.
 
     Args:
         - s3: boto3 client for using AWS S3 bucket
@@ -136,20 +260,21 @@ def process_elements_data(s3, final_directory):
     """
 
     print("********* STEP 5 (elements) START ************")
-    data_elements = pd.read_csv('data/Elements.csv')
+    data_elements = pv.read_csv(
+        'data/Elements.csv',
+        parse_options=pv.ParseOptions(newlines_in_values=True),
+        convert_options=pv.ConvertOptions(
+            include_columns=['Element Code', 'Element', 'Unit', 'Description'],
+            column_types={'Element Code': pa.int64(), 'Element': pa.string(),
+                          'Unit': pa.string(), 'Description': pa.string()},
+            strings_can_be_null=True))
 
     # data transformations
-    data_element_final = data_elements.rename(
-        columns={'Element Code': 'element_code', 'Element': 'element',
-                 'Unit': 'unit', 'Description': 'description'})
+    data_elements = data_elements.rename_columns(
+        ['element_code', 'element', 'unit', 'description'])
 
-    # saving result file
-    data_element_final.to_csv(
-        f'{final_directory}/dim_element.csv', index=False)
-
-    # upload file to S3
-    s3.upload_file(f'{final_directory}/dim_element.csv',
-                   config["AWS"]["OUTPUT_DATA"], 'dim_element.csv')
+    # saving result file locally and in S3 bucket
+    save_and_upload(s3, data_elements, final_directory, 'dim_element.parquet')
     print("********* STEP 5 (elements) FINISHED ************")
 
 
@@ -158,7 +283,7 @@ def process_elements_data(s3, final_directory):
 def process_country_group_data(s3, final_directory):
     """Load input 'CountryGroup.csv' data,
         make transformations and
-        store the result CSV file first locally and then upload to S3 bucket.
+        store the result Parquet file locally and upload it to S3 bucket.
 
     Args:
         - s3: boto3 client for using AWS S3 bucket
@@ -166,387 +291,307 @@ def process_country_group_data(s3, final_directory):
     """
 
     print("********* STEP 6 (country group) START ************")
-    data_country_group = pd.read_csv('data/CountryGroup.csv')
+    data_country_group = pv.read_csv(
+        'data/CountryGroup.csv',
+        parse_options=pv.ParseOptions(newlines_in_values=True),
+        convert_options=pv.ConvertOptions(
+            include_columns=['Country Group', 'Country', 'M49 Code'],
+            column_types={'Country Group': pa.string(), 'Country': pa.string(),
+                          'M49 Code': pa.int64()},
+            strings_can_be_null=True))
 
     # data transformations
-    data_country_group_final = data_country_group.rename(
-        columns={'Country Group': 'country_group',
-                 'Country': 'country', 'M49 Code': 'm49_code'})\
-        .drop(columns=['Country Group Code',
-                       'Country Code', 'ISO2 Code', 'ISO3 Code'])
+    data_country_group = data_country_group.rename_columns(
+        ['country_group', 'country', 'm49_code'])
 
-    # saving result file
-    data_country_group_final.to_csv(
-        f'{final_directory}/dim_country_group.csv', index=False)
-
-    # upload file to S3
-    s3.upload_file(f'{final_directory}/dim_country_group.csv',
-                   config["AWS"]["OUTPUT_DATA"], 'dim_country_group.csv')
+    # saving result file locally and in S3 bucket
+    save_and_upload(s3, data_country_group,
+                    final_directory, 'dim_country_group.parquet')
     print("********* STEP 6 (country group) FINISHED ************")
 
 
 # ----------------------------------------------------------------
 # WorldData data source
+def fact_partition_file_name(partition_index):
+    """Name of the Parquet file written for one partition of the fact table.
+
+    Args:
+        - partition_index: index of the partition in the fact table
+    """
+    return f'part.{partition_index}.parquet'
+
+
 def process_world_file_data(s3, final_directory):
     """Load input 'WorldData.csv' data,
         make transformations and
-        store the result CSV file first locally and then upload to S3 bucket.
-        Also creates a list of countries with their unique codes and saves it
-        locally as a separate file.
+        store the result Parquet files first locally and then upload to S3 bucket.
+        Also creates a list of countries with their unique codes
+        that is passed on to the API step.
 
     Args:
         - s3: boto3 client for using AWS S3 bucket
         - final_directory: path to the output of the current ETL pipeline
+
+    Returns:
+        pandas dataframe with unique countries and their codes.
     """
 
     print("********* STEP 7 (world data) START ************")
     file_world_data = "data/WorldData.csv"
-    world_data = dd.read_csv(file_world_data, encoding="cp1252")
-
-    # create a file with unique values for Countries (and their codes)
-    countries = world_data[[
-        'Area', 'Area Code (M49)']].drop_duplicates().compute()
-    countries['Area Code (M49)'] = countries['Area Code (M49)'].str.lstrip("'")
-    current_datetime = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
-    str_current_datetime = str(current_datetime)
-    countries.to_csv(f'data/countries_list_{str_current_datetime}.csv')
+    # only the columns needed for the outputs are parsed
+    world_data = dd.read_csv(
+        file_world_data, encoding="cp1252",
+        usecols=['Area Code (M49)', 'Area', 'Item Code', 'Element Code',
+                 'Year', 'Unit', 'Value', 'Flag'],
+        dtype={'Area Code (M49)': 'string[pyarrow]', 'Area': 'string[pyarrow]',
+               'Item Code': 'int64', 'Element Code': 'int64', 'Year': 'int64',
+               'Unit': 'string[pyarrow]', 'Value': 'float64',
+               'Flag': 'string[pyarrow]'})
+
+    # remove leading apostrophe from area code, the column is Arrow-backed
+    # so the strip runs as the pyarrow utf8_ltrim kernel for both outputs
+    world_data['Area Code (M49)'] = world_data['Area Code (M49)'].str.lstrip("'")
+
+    # unique values for Countries (and their codes)
+    countries_task = world_data[['Area', 'Area Code (M49)']].drop_duplicates()
 
     # data transformations
     world_data_final = world_data.rename(
         columns={'Area Code (M49)': 'area_code_m49', 'Item Code': 'item_code',
                  'Element Code': 'element_code', 'Year': 'year', 'Unit': 'unit_name',
                  'Value': 'value', 'Flag': 'flag_code'})\
-        .drop(columns=['Area Code', 'Area', 'Item Code (CPC)', 'Item', 'Element', 'Year Code'])
-
-    # remove star from area code
-    world_data_final['area_code_m49'] = world_data_final['area_code_m49'].str.lstrip(
-        "'")
-
-    # saving result file
-    world_data_final.to_csv(
-        f'{final_directory}/fact_world_data.csv', single_file=True)
-
-    # upload file to S3
-    s3.upload_file(f'{final_directory}/fact_world_data.csv',
-                   config["AWS"]["OUTPUT_DATA"], 'fact_world_data.csv')
+        .drop(columns=['Area'])
+
+    # saving result file, computed together with the countries
+    # so that the source file is scanned only once
+    # the folder is cleared first so that partition files of earlier runs are not kept
+    fact_directory = Path(final_directory) / 'fact_world_data'
+    world_data_task = world_data_final.to_parquet(
+        fact_directory, engine='pyarrow',
+        compression='zstd', write_index=False, overwrite=True,
+        name_function=fact_partition_file_name, compute=False)
+    countries, _ = dd.compute(countries_task, world_data_task)
+
+    # upload partition files written by this run to S3 concurrently
+    part_files = [fact_directory / fact_partition_file_name(i)
+                  for i in range(world_data_final.npartitions)]
+    with ThreadPoolExecutor(max_workers=PARTITION_UPLOAD_WORKERS) as executor:
+        list(executor.map(
+            lambda part_file: s3.upload_file(str(part_file), BUCKET,
+                                             f'fact_world_data/{part_file.name}',
+                                             Config=TRANSFER_CONFIG),
+            part_files))
+
+    # remove partition files left in S3 bucket by earlier runs with more partitions
+    uploaded_keys = {f'fact_world_data/{part_file.name}' for part_file in part_files}
+    stale_keys = [key for key in list_object_keys(s3, 'fact_world_data/')
+                  if key not in uploaded_keys]
+    delete_objects(s3, stale_keys)
     print("********* STEP 7 (world data) FINISHED ************")
+    return countries
 
 
 # ----------------------------------------------------------------
 # API restcountries  data source
-def process_countries_data(s3, final_directory):
-    """Take file with unique countries codes,
+def fetch_country_info(session, country_code):
+    """Get information about one country from the restcountries API.
+
+    Args:
+        - session: requests session shared between API calls
+        - country_code: 3-digit M49 code of the country
+
+    Returns:
+        Parsed JSON response, or None if the country was not found.
+    """
+    url = "https://restcountries.com/v3.1/alpha/"+country_code + \
+        "?fields=ccn3,flags,name,capital,languages,area,population"
+    r = session.get(url, timeout=10)
+    if r.status_code >= 201:
+        return None
+    return orjson.loads(r.content)
+
+
+def process_countries_data(s3, final_directory, countries):
+    """Take unique countries codes,
         connect to API endpoint with countries data using
         unique countries codes, get information about countries,
         make transformations and
-        store the result CSV file first locally and then upload to S3 bucket.
+        store the result Parquet file locally and upload it to S3 bucket.
 
     Args:
         - s3: boto3 client for using AWS S3 bucket
         - final_directory: path to the output of the current ETL pipeline
+        - countries: dataframe with unique countries and their codes from step 7
     """
 
     print("********* STEP 8 (API countries) START ************")
     # get the list of countries codes that will be used as a parameter for API calls
-    list_of_files = glob.glob('data/countries_list_*')
-    latest_file = max(list_of_files, key=os.path.getctime)
-    print(latest_file)
-
-    df_countries = pd.read_csv(latest_file)
-    list_of_countries = []
-    for i in df_countries.values:
-        list_of_countries.append(f'{i[2]:03d}')
+    list_of_countries = countries['Area Code (M49)'].str.zfill(3).tolist()
 
     print(len(list_of_countries))
 
     # make API calls to get information about the countries, save results in json files
-    result_file_countries = []
-    for i in list_of_countries:
-        url = "https://restcountries.com/v3.1/alpha/"+i + \
-            "?fields=ccn3,flags,name,capital,languages,area,population"
-        r = requests.get(url, timeout=10)
-        if r.status_code >= 201:
-            continue
-        data = r.json()
-        result_file_countries.append(data)
-
-    # result_file_countries
-    json_object = json.dumps(result_file_countries, indent=4)
-
-    # Writing to countries_info.json
-    with open("data/countries_info.json", "w", encoding="utf-8") as outfile:
-        outfile.write(json_object)
-
-    # data transformations
-    data_ctb = json.load(open('data/countries_info.json', encoding="utf-8"))
+    # requests are issued concurrently over a shared pooled session,
+    # responses cached by previous runs are served without network calls
+    with requests_cache.CachedSession(API_CACHE_NAME, backend='sqlite',
+                                      expire_after=API_CACHE_EXPIRE_AFTER) as session:
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=API_MAX_WORKERS, pool_maxsize=API_MAX_WORKERS)
+        session.mount('https://', adapter)
+        with ThreadPoolExecutor(max_workers=API_MAX_WORKERS) as executor:
+            responses = executor.map(
+                lambda code: fetch_country_info(session, code), list_of_countries)
+            result_file_countries = [data for data in responses if data is not None]
+
+    # Writing raw API results to countries_info.json
+    with open("data/countries_info.json", "wb") as outfile:
+        outfile.write(orjson.dumps(result_file_countries, option=orjson.OPT_INDENT_2))
+
+    # data transformations, done on the API results already in memory
     countries_info_data = []
-    for item in data_ctb:
-        if item['languages']:
-            item['languages'] = ', '.join(str(value)
-                                          for value in item['languages'].values())
-        if item['capital']:
-            item['capital'] = ', '.join(value for value in item['capital'])
-        if item['name']['nativeName']:
-            del item['name']['nativeName']
+    for item in result_file_countries:
+        # empty values become nulls so that each column keeps a single type
+        item['languages'] = ', '.join(str(value)
+                                      for value in item['languages'].values()) or None
+        item['capital'] = ', '.join(value for value in item['capital']) or None
+        item['name'].pop('nativeName', None)
 
         countries_info_data.append(item)
 
-    countries_info_data_final = pd.json_normalize(countries_info_data)
+    # nested fields (name, flags) are flattened by Arrow into 'name.common', etc.
+    countries_info_data_final = pa.Table.from_pylist(countries_info_data).flatten()
 
-    # saving result file
-    countries_info_data_final.to_csv(
-        f'{final_directory}/dim_country_info.csv')
-
-    # saving result file in S3 bucket
-    s3.upload_file(f'{final_directory}/dim_country_info.csv',
-                   config["AWS"]["OUTPUT_DATA"], 'dim_country_info.csv')
+    # saving result file locally and in S3 bucket
+    save_and_upload(s3, countries_info_data_final,
+                    final_directory, 'dim_country_info.parquet')
     print("********* STEP 8 (API countries) FINISHED ************")
 
 
 # =================================================================
 # 4.2 Data Quality Checks
 # ----------------------------------------------------------------
+def get_object_size(s3, key):
+    """Get the size of an object in S3 bucket with a single HEAD request.
+
+    Args:
+        - s3: boto3 client for using AWS S3 bucket
+        - key: key of the object in S3 bucket
+
+    Returns:
+        Size of the object in bytes, or None if the object is not uploaded.
+    """
+    try:
+        return s3.head_object(Bucket=BUCKET, Key=key)['ContentLength']
+    except ClientError as error:
+        if error.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            return None
+        raise
+
+
 def quality_checks(s3):
     # ------------------------------------------------------------
     """Check that each result file is saved locally in the correct folder,
-        and is not empty,
         and verify that the file is fully uploaded to the 
-        correct AWS S3 bucket.
+        correct AWS S3 bucket and is not empty.
+        For partitioned results also check that S3 bucket
+        holds no partition files other than the local ones.
 
     Args:
         - s3: boto3 client for using AWS S3 bucket
     """
-    # data quality checks for dim_unit.csv
-    # check that the file is saved in the right directory
     print("********* STEP 9 (quality checks) START ************")
-    path = 'output/dim_unit.csv'
-
-    if os.path.isfile(path) is True:
-        print('The file is saved in the correct local folder')
-    else:
-        print('The file not in saved, or in the wrong folder!')
-
-    # check that the file is not empty
-    if os.stat('output/dim_unit.csv').st_size != 0:
-        print('The file is not empty')
-    else:
-        print('The file is EMPTY!')
-
-    # check that the file is uploaded to S3 bucket
-    response = s3.list_objects_v2(
-        Bucket=config["AWS"]["OUTPUT_DATA"],
-        Prefix='dim_unit.csv',
-    )
-
-    if 'Contents' in response:
-        print('Object has fully uploaded to S3')
-    else:
-        print('Object has not fully uploaded to S3')
-
-    # ------------------------------------------------------------
-    # data quality checks for dim_item_group.csv
-
-    # check that the file is saved in the right directory
-    path = 'output/dim_item_group.csv'
-
-    if os.path.isfile(path) is True:
-        print('The file is saved in the correct local folder')
-    else:
-        print('The file not in saved, or in the wrong folder!')
-
-    # check that the file is not empty
-    if os.stat('output/dim_item_group.csv').st_size != 0:
-        print('The file is not empty')
-    else:
-        print('The file is EMPTY!')
-
-    # check that the file is uploaded to S3 bucket
-    response = s3.list_objects_v2(
-        Bucket=config["AWS"]["OUTPUT_DATA"],
-        Prefix='dim_item_group.csv',
-    )
-
-    if 'Contents' in response:
-        print('Object has fully uploaded to S3')
-    else:
-        print('Object has not fully uploaded to S3')
-
-    # ------------------------------------------------------------
-    # quality checks for dim_flag.csv
-
-    # check that the file is saved in the right directory
-    path = 'output/dim_flag.csv'
-
-    if os.path.isfile(path) is True:
-        print('The file is saved in the correct local folder')
-    else:
-        print('The file not in saved, or in the wrong folder!')
-
-    # check that the file is not empty
-    if os.stat('output/dim_flag.csv').st_size != 0:
-        print('The file is not empty')
-    else:
-        print('The file is EMPTY!')
-
-    # check that the file is uploaded to S3 bucket
-    response = s3.list_objects_v2(
-        Bucket=config["AWS"]["OUTPUT_DATA"],
-        Prefix='dim_flag.csv',
-    )
-
-    if 'Contents' in response:
-        print('Object has fully uploaded to S3')
-    else:
-        print('Object has not fully uploaded to S3')
-
-    # ------------------------------------------------------------
-    # quality checks for dim_element.csv
-
-    # check that the file is saved in the right directory
-    path = 'output/dim_element.csv'
-
-    if os.path.isfile(path) is True:
-        print('The file is saved in the correct local folder')
-    else:
-        print('The file not in saved, or in the wrong folder!')
-
-    # check that the file is not empty
-    if os.stat('output/dim_element.csv').st_size != 0:
-        print('The file is not empty')
-    else:
-        print('The file is EMPTY!')
-
-    # check that the file is uploaded to S3 bucket
-    response = s3.list_objects_v2(
-        Bucket=config["AWS"]["OUTPUT_DATA"],
-        Prefix='dim_element.csv',
-    )
-
-    if 'Contents' in response:
-        print('Object has fully uploaded to S3')
-    else:
-        print('Object has not fully uploaded to S3')
-
-    # ------------------------------------------------------------
-    # quality checks for dim_country_group.csv
-
-    # check that the file is saved in the right directory
-    path = 'output/dim_country_group.csv'
-
-    if os.path.isfile(path) is True:
-        print('The file is saved in the correct local folder')
-    else:
-        print('The file not in saved, or in the wrong folder!')
-
-    # check that the file is not empty
-    if os.stat('output/dim_country_group.csv').st_size != 0:
-        print('The file is not empty')
-    else:
-        print('The file is EMPTY!')
-
-    # check that the file is uploaded to S3 bucket
-    response = s3.list_objects_v2(
-        Bucket=config["AWS"]["OUTPUT_DATA"],
-        Prefix='dim_country_group.csv',
-    )
-
-    if 'Contents' in response:
-        print('Object has fully uploaded to S3')
-    else:
-        print('Object has not fully uploaded to S3')
-
-    # ------------------------------------------------------------
-    # quality checks for fact_world_data.csv
-
-    # check that the file is saved in the right directory
-    path = 'output/fact_world_data.csv'
-
-    if os.path.isfile(path) is True:
-        print('The file is saved in the correct local folder')
-    else:
-        print('The file not in saved, or in the wrong folder!')
-
-    # check that the file is not empty
-    if os.stat('output/fact_world_data.csv').st_size != 0:
-        print('The file is not empty')
-    else:
-        print('The file is EMPTY!')
-
-    # check that the file is uploaded to S3 bucket
-    response = s3.list_objects_v2(
-        Bucket=config["AWS"]["OUTPUT_DATA"],
-        Prefix='fact_world_data.csv',
-    )
-
-    if 'Contents' in response:
-        print('Object has fully uploaded to S3')
-    else:
-        print('Object has not fully uploaded to S3')
-
-    # ------------------------------------------------------------
-    # quality checks for dim_country_info.csv
-
-    # check that the file is saved in the right directory
-    path = 'output/dim_country_info.csv'
-
-    if os.path.isfile(path) is True:
-        print('The file is saved in the correct local folder')
-    else:
-        print('The file not in saved, or in the wrong folder!')
-
-    # check that the file is not empty
-    if os.stat('output/dim_country_info.csv').st_size != 0:
-        print('The file is not empty')
-    else:
-        print('The file is EMPTY!')
-
-    # check that the file is uploaded to S3 bucket
-    response = s3.list_objects_v2(
-        Bucket=config["AWS"]["OUTPUT_DATA"],
-        Prefix='dim_country_info.csv',
-    )
-
-    if 'Contents' in response:
-        print('Object has fully uploaded to S3')
-    else:
-        print('Object has not fully uploaded to S3')
+    # S3 keys of each result file, partitioned results have a key per partition file
+    result_keys = {}
+    partitioned_results = set()
+    for result_file in RESULT_FILES:
+        path = Path('output') / result_file
+        if path.is_dir():
+            partitioned_results.add(result_file)
+            result_keys[result_file] = [f'{result_file}/{part_file.name}'
+                                        for part_file in sorted(path.iterdir())]
+        else:
+            result_keys[result_file] = [result_file]
+
+    # request sizes of all objects in S3 bucket concurrently
+    all_keys = [key for keys in result_keys.values() for key in keys]
+    with ThreadPoolExecutor(max_workers=QUALITY_CHECK_WORKERS) as executor:
+        object_sizes = dict(zip(all_keys, executor.map(
+            lambda key: get_object_size(s3, key), all_keys)))
+
+    for result_file, keys in result_keys.items():
+        print(f'Quality checks for {result_file}')
+
+        # check that the file is saved in the right directory
+        if (Path('output') / result_file).exists():
+            print('The file is saved in the correct local folder')
+        else:
+            print('The file not in saved, or in the wrong folder!')
+
+        # check that the file is uploaded to S3 bucket
+        sizes = [object_sizes[key] for key in keys]
+        # an empty folder without partition files counts as not uploaded
+        if sizes and all(size is not None for size in sizes):
+            print('Object has fully uploaded to S3')
+
+            # check that the uploaded file is not empty
+            if all(size != 0 for size in sizes):
+                print('The file is not empty')
+            else:
+                print('The file is EMPTY!')
+        else:
+            print('Object has not fully uploaded to S3')
+
+        # check that S3 bucket holds no partition files other than the local ones
+        if result_file in partitioned_results:
+            extra_keys = sorted(set(list_object_keys(s3, f'{result_file}/'))
+                                - set(keys))
+            if extra_keys:
+                print(f'S3 bucket has extra partition files: {", ".join(extra_keys)}')
+            else:
+                print('S3 bucket has no extra partition files')
     print("********* STEP 9 (quality checks) FINISHED ************")
 
 
 def main():
     """Load input data,
         process the data to extract dimension and fact tables,
-        store processed data in CSV format in AWS S3 bucket.
+        store processed data in Parquet format in AWS S3 bucket.
 
         Args: None
 
         Output:
-        S3 bucket with the following CSV files: 
-        - units.csv file 
+        S3 bucket with the following Parquet files: 
+        - dim_unit.parquet file 
         ....
 
     """
     current_directory = os.getcwd()
-    s3 = boto3.client('s3')
+    s3 = boto3.client('s3', config=Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS))
     prepare_data_sources(current_directory)
 
-    os.environ['AWS_ACCESS_KEY_ID'] = config["AWS"]['AWS_ACCESS_KEY_ID']
-    os.environ['AWS_SECRET_ACCESS_KEY'] = config["AWS"]['AWS_SECRET_ACCESS_KEY']
+    os.environ['AWS_ACCESS_KEY_ID'] = AWS_KEYS['AWS_ACCESS_KEY_ID']
+    os.environ['AWS_SECRET_ACCESS_KEY'] = AWS_KEYS['AWS_SECRET_ACCESS_KEY']
 
     # creating output folder where the result files will be uploaded
     # current_directory = os.getcwd()
 
-    final_directory = os.path.join(current_directory, r'output')
-    if not os.path.exists(final_directory):
-        os.makedirs(final_directory)
-
-    process_units_data(s3, final_directory)
-    process_item_group_data(s3, final_directory)
-    process_flags_data(s3, final_directory)
-    process_elements_data(s3, final_directory)
-    process_country_group_data(s3, final_directory)
-    process_world_file_data(s3, final_directory)
-    process_countries_data(s3, final_directory)
+    final_directory = Path(current_directory) / 'output'
+    final_directory.mkdir(parents=True, exist_ok=True)
+
+    # dimension tables read distinct sources and write distinct outputs,
+    # so they are processed concurrently to overlap disk reads and S3 uploads
+    with ThreadPoolExecutor(max_workers=DIMENSION_WORKERS) as executor:
+        futures = [executor.submit(process_step, s3, final_directory)
+                   for process_step in (process_units_data,
+                                        process_item_group_data,
+                                        process_flags_data,
+                                        process_elements_data,
+                                        process_country_group_data)]
+        for future in futures:
+            future.result()
+
+    countries = process_world_file_data(s3, final_directory)
+    process_countries_data(s3, final_directory, countries)
     quality_checks(s3)
 
 